@@ -6,17 +6,24 @@ class BetaReductionVisitor(object):
     """
 
     def visit_Schema_down(self, t: T.Schema) -> None:
-        self.definitions = t.definitions
+        self.definitions = t.definitions.values  # Definition nodes, by name
+        self.resolved = {}  # Reduced definitions, by name
 
     def visit_Schema_up(self, t: T.Schema) -> T.Schema:
         return T.Schema(value=t.value, definitions=T.Definitions(values={}))
 
     def visit_Reference_down(self, t: T.Reference) -> T.Type:
+        # Each definition is reduced once, then shared by all its references.
         try:
-            definition = self.definitions.values[t.value]
+            return self.resolved[t.value]
+        except KeyError:
+            pass
+        try:
+            definition = self.definitions[t.value]
         except KeyError:
             raise ValueError(f"Missing definition for {t.value}")
-        return definition.visit(self)
+        reduced = self.resolved[t.value] = definition.visit(self)
+        return reduced
 
 
 def reduce(t: T.Schema) -> T.Schema:
@@ -1,5 +1,6 @@
 import sys
 import json
+import importlib.util
 from argparse import ArgumentParser
 
 from .parse import parse
@@ -64,10 +65,13 @@ def main():
         print(f"JSON Schema compact notation v{__version__}.")
         exit(0)
 
-    input = open(args.filename, "r") if args.filename != "-" else sys.stdin
-    output = open(args.output, "w") if args.output != "-" else sys.stdout
-
-    source = input.read()
+    # Read raw bytes in one go and decode them once, rather than going
+    # through a text wrapper's newline translation.
+    if args.filename == "-":
+        source = sys.stdin.buffer.read().decode("utf-8")
+    else:
+        with open(args.filename, "rb") as input:
+            source = input.read().decode("utf-8")
     try:
         schema = parse("schema", source, verbose=args.verbose)
     except ValueError as e:
@@ -81,16 +85,22 @@ def main():
     if args.format:
         result = str(schema)
     else:
-        json = schema.jsonschema
+        compiled = schema.jsonschema
         if not args.source:
-            del json["$comment"]
-        try:
+            del compiled["$comment"]
+        if importlib.util.find_spec("jsview") is not None:
             # TODO Try and guess TTY width
             import jsview
-            result = jsview.dumps(json)
-        except ModuleNotFoundError:
-            # Raw printing if jsview isn't installed
-            result = json.dumps(json)
+            result = jsview.dumps(compiled)
+        else:
+            # Raw printing if jsview isn't installed. Not with orjson: it
+            # rejects integers beyond 64 bits, and doesn't escape non-ASCII.
+            result = json.dumps(compiled, separators=(",", ":"))
 
-    output.write(result + "\n")
-    output.flush()
+    # Only open the output once there's a result, so that errors don't
+    # leave a truncated output file behind.
+    if args.output == "-":
+        sys.stdout.write(result + "\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(result + "\n")
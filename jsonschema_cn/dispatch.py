@@ -0,0 +1,31 @@
+from parsimonious import NodeVisitor
+from parsimonious.exceptions import VisitationError, UndefinedLabel
+
+
+class DispatchingNodeVisitor(NodeVisitor):
+    """NodeVisitor which resolves its `visit_*` methods once, at construction
+    time, rather than with a `getattr()` on every visited node."""
+
+    SKIPPED_EXPRESSIONS = frozenset()  # Nodes dropped, subtrees included
+
+    def __init__(self):
+        self.dispatch = {
+            name[len("visit_"):]: getattr(self, name)
+            for name in dir(self)
+            if name.startswith("visit_")
+        }
+
+    def visit(self, node):
+        """Same as `NodeVisitor.visit()`, errors handling included."""
+        method = self.dispatch.get(node.expr_name, self.generic_visit)
+        skipped = self.SKIPPED_EXPRESSIONS
+        try:
+            return method(node, [
+                self.visit(n) for n in node.children if n.expr_name not in skipped
+            ])
+        except (VisitationError, UndefinedLabel):
+            raise
+        except Exception as exc:
+            if isinstance(exc, self.unwrapped_exceptions):
+                raise
+            raise VisitationError(exc, type(exc), node) from exc
@@ -6,28 +6,36 @@ src = r"""
 schema = _ type _ opt_definitions _
 type = sequence_and (_ or _ sequence_and)*
 sequence_and = simple_type (_ and _ simple_type)*
-simple_type = litteral / kw_forbidden / string / object / integer / number / array /
-       lit_regex / lit_format / constant / parens / not_type / def_reference /
-       conditional
+# Alternatives start with distinct tokens, so their order only matters for
+# speed: most frequent first.
+simple_type = integer / object / string / constant / array / def_reference /
+       litteral / number / lit_regex / parens / not_type / kw_forbidden /
+       conditional / lit_format
 parens = lparen _ type _ rparen
 
-litteral = KEYWORD("boolean") / KEYWORD("null")
+litteral = ~"boolean|null"i
 
 lit_integer =  ~"0x[0-9a-fA-F]+" / ~"[0-9]+"
 lit_regex = regex_prefix lit_string
 lit_format = format_prefix lit_string
 
-lit_string = quote_char (non_quote_char*) quote_char
-
+# Single terminal: backslash-escaped chars, lone backslashes (before a
+# newline or the end), or anything but quotes and backslashes.
+# The second alternative never matches: for unterminated strings, it
+# reports the missing closing quote where it was expected.
+lit_string = ~r'"(?:\\.|\\(?!.)|[^"\\])*"' / unterminated_string
+unterminated_string = ~r'"(?:\\.|\\(?!.)|[^"\\])*' quote_char
 quote_char = "\""
-backslash_char = "\\"
-non_quote_char = escaped_char / ~"[^\"]"
-escaped_char = backslash_char ~"."
 
 constant = backquote_constant / lit_string
-backquote_constant = backquote_char (neither_quote_nor_backquote / lit_string)* backquote_char
+# Same as lit_string between backquotes, with string literals allowed inside.
+# Unterminated constants are reported the same way as unterminated strings;
+# when the regex stops on a quote, that's where an unterminated string starts.
+backquote_constant = ~r'`(?:\\.|\\(?!.)|[^"`\\]|"(?:\\.|\\(?!.)|[^"\\])*")*`' /
+    unterminated_backquote_constant
+unterminated_backquote_constant =
+    ~r'`(?:\\.|\\(?!.)|[^"`\\]|"(?:\\.|\\(?!.)|[^"\\])*")*' (lit_string / backquote_char)
 backquote_char = "`"
-neither_quote_nor_backquote = escaped_char / (~"[^\"`]")
 
 string = KEYWORD("string") _ opt_cardinal
 integer = KEYWORD("integer") _ opt_cardinal _ opt_multiple
@@ -78,27 +86,22 @@ card_1 = lit_integer
 card_min = lit_integer _ comma? _ wildcard
 card_max = wildcard _ comma? _ lit_integer
 
-object = object_empty / object_non_empty / object_keyword
-object_empty = lbrace _ object_only _ rbrace opt_cardinal
+object = object_braces / object_keyword
 object_keyword = kw_object opt_cardinal
-object_non_empty = lbrace _
-                   object_only _
-                   object_pair (_ comma _ object_pair)* _
-                   rbrace
-                   opt_cardinal
+# Bodies are unnamed alternatives to the closing brace/bracket: a named rule
+# failing there would hide the property/item at fault from error messages.
+object_braces = lbrace _ object_only _
+    (rbrace / (object_pair (_ comma _ object_pair)* _ rbrace)) opt_cardinal
 object_only = (kw_only _ ((lit_regex/def_reference/wildcard) _ (colon _ type)?)? comma?)?
 object_pair = object_pair_name _ question? _ colon _ object_pair_type _ lit_string?
-object_pair_name = lit_string / object_pair_unquoted_name
+object_pair_name = object_pair_unquoted_name / lit_string
 object_pair_unquoted_name = ~"[A-Za-z0-9][-_A-Za-z0-9]*"
 object_pair_type = type / wildcard
 
-array = array_empty / array_non_empty
-array_empty = ((lbracket _ rbracket) / kw_array) _ opt_cardinal
-array_non_empty = lbracket _ array_prefix _
-                  type (_ comma _ type)* _
-                  array_extra _
-                  rbracket _
-                  opt_cardinal
+array = array_brackets / array_keyword
+array_keyword = kw_array _ opt_cardinal
+array_brackets = lbracket _
+    (rbracket / (array_prefix _ type (_ comma _ type)* _ array_extra _ rbracket)) _ opt_cardinal
 array_prefix = ((kw_only / kw_unique) _) *
 array_extra = (plus / star)?
 
@@ -109,21 +112,18 @@ def_equal = "="
 def_reference = "<" def_identifier ">"
 def_identifier = ~"[A-Za-z_][-A-Za-z_0-9]*"
 
-_ = meaninglessness*
-meaninglessness = ~r"\s+" / comment
-comment = ~r"#[^\r\n]*"
+# Spaces and comments, in a single terminal.
+_ = ~r"(?:\s|#[^\r\n]*)*"
 """
 
 
-def make_keywords_case_insensitive(src):
-    """Replace occurences of KEYWORD("...") by a regex allowing all capitalizations
-    of the keyword between quotes."""
+KEYWORD_REGEX = re.compile(r'KEYWORD\("([a-z]+)"\)')
 
-    def f(m):
-        return '~"' + "".join(f"[{x.lower()}{x.upper()}]" for x in m[1]) + '"'
 
-    r = re.compile(r'KEYWORD\("([a-z]+)"\)')
-    return r.sub(f, src)
+def make_keywords_case_insensitive(src):
+    """Replace occurences of KEYWORD("...") by a case-insensitive regex
+    matching the keyword between quotes."""
+    return KEYWORD_REGEX.sub(r'~"\1"i', src)
 
 
 grammar = Grammar(make_keywords_case_insensitive(src))
@@ -10,28 +10,32 @@ TODO: string constants may contain unbalanced parenthese
       This involves detecting double-quotes and backslashes
       before double-quotes.
 """
+import re
 
 OPENING = set("[{(")
 CLOSING = set("]})")
 
+# Maps every bracket to "(" or ")", so that a line's bracket balance
+# comes from two C-level `str.count` calls instead of a per-char loop.
+BRACKETS = str.maketrans({**dict.fromkeys(OPENING, "("), **dict.fromkeys(CLOSING, ")")})
+# Leading whitespace and closers, on a translated line.
+LEADING = re.compile(r"[\s)]*")
+
 def indent(src, step=2):
     i = 0
     output = []
-    for line in src.split("\n"):
-        line = line.strip()
-        j = 0
-        for k in line:
-            if k.isspace():
-                pass
-            elif k in CLOSING:
-                i -= 1
-            else:
-                break
-            j += 1
-        output.append(" " * (i*step) + line)
-        for k in line[j:]:
-            if k in OPENING:
-                i += 1
-            elif k in CLOSING:
-                i -= 1
+    prefixes = {}  # Indentation strings, by depth
+    for line, brackets in zip(src.split("\n"), src.translate(BRACKETS).split("\n")):
+        brackets = brackets.strip()
+        rest = brackets.lstrip(")")
+        leading = len(brackets) - len(rest)
+        if leading and rest[:1].isspace():
+            # Closers interleaved with spaces: rare, let a regex sort it out.
+            leading = LEADING.match(brackets).group().count(")")
+        depth = i - leading
+        prefix = prefixes.get(depth)
+        if prefix is None:
+            prefix = prefixes[depth] = " " * (depth*step)
+        output.append(prefix + line.strip())
+        i += brackets.count("(") - brackets.count(")")
     return "\n".join(output)
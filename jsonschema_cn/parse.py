@@ -3,22 +3,42 @@ from .peg_visitor import TreeBuildingVisitor
 from . import grammar
 from . import tree as T
 from parsimonious.exceptions import ParseError
+from functools import lru_cache
+import pickle
+import sys
 
-jscn_visitor = TreeBuildingVisitor()
 unspace_visitor = UnspaceVisitor()
 
 
 def parse(what: str, source: str, verbose=False) -> T.Type:
+    if verbose:
+        # Verbose parsing is about printing intermediate trees: don't cache.
+        return _parse(what, source, verbose=True)
+    # Callers may alter the tree, its compiled jsonschema or its definitions:
+    # hand out a fresh tree, unpickled from the cache. That's much cheaper
+    # than parsing again, and than deep-copying a cached tree.
+    return pickle.loads(_cached_parse(what, source))
+
+
+@lru_cache(maxsize=1024)
+def _cached_parse(what: str, source: str) -> bytes:
+    return pickle.dumps(_parse(what, source), pickle.HIGHEST_PROTOCOL)
+
+
+def _parse(what: str, source: str, verbose=False) -> T.Type:
     try:
         raw_tree = grammar[what].parse(source)
     except ParseError as e:
         raise ValueError(f"Invalid JSCN syntax line {e.line()} column {e.column()} (rule {e.expr.name})") from None
 
-    unspaced_tree = unspace_visitor.visit(raw_tree)
     if verbose:
-        print("PEG tree:\n" + unspaced_tree.prettily())
-    parsed_tree = jscn_visitor.visit(unspaced_tree)
+        unspaced_tree = unspace_visitor.visit(raw_tree)
+        sys.stderr.write("PEG tree:\n%s\n" % unspaced_tree.prettily())
+    # Spaces are skipped while building the tree, no separate pass needed.
+    # One visitor per parse, so that its Reference pool is neither shared
+    # between threads, nor kept alive after the parse.
+    parsed_tree = TreeBuildingVisitor().visit(raw_tree)
     if verbose:
-        print("JSCN tree:\n" + parsed_tree.prettily())
+        sys.stderr.write("JSCN tree:\n%s\n" % parsed_tree.prettily())
     parsed_tree.source = source
     return parsed_tree
@@ -2,22 +2,30 @@
 Parsimonious visitor.
 
 Parsimonious parsers return parse trees, which can be converted through visitors.
-The Parsimonious parse trees are converted in two steps: a first visitor
-(cf `unspace.py`) removes all space tokens, then the `TreeBuildingVisitor` here
-converts it into a proper Abstract Syntax Tree (with node types from `tree.py`).
+The `TreeBuildingVisitor` here converts them into a proper Abstract Syntax Tree
+(with node types from `tree.py`), skipping space tokens as it goes: visit
+methods never see them. The standalone `UnspaceVisitor` (cf `unspace.py`)
+removes them from a Parsimonious tree, for printing.
 """
 
-from parsimonious import NodeVisitor
 from collections.abc import Sequence
 from typing import Tuple, Optional, Set, Dict
 import json
+import sys
 
 from . import tree as T
 from .grammar import grammar
 from .unspace import UnspaceVisitor
+from .dispatch import DispatchingNodeVisitor
 
 
-class TreeBuildingVisitor(NodeVisitor):
+class TreeBuildingVisitor(DispatchingNodeVisitor):
+
+    SKIPPED_EXPRESSIONS = frozenset({"_"})  # Spaces and comments
+
+    # Semantic errors, such as inconsistent cardinals, are reported as such
+    # rather than wrapped into Parsimonious' `VisitationError`.
+    unwrapped_exceptions = (ValueError,)
 
     # TODO: this was a generic way to simplify single-element nodes
     #       from the parse tree. Given the limited number of nodes
@@ -35,6 +43,13 @@ class TreeBuildingVisitor(NodeVisitor):
         "parens": 1,
     }
 
+    def __init__(self):
+        super().__init__()
+        # Flyweight pool: all references to a given name share one node.
+        # A visitor is meant for a single parse: sharing nodes across parses
+        # would share their cached jsonschema dicts between unrelated schemas.
+        self.references = {}
+
     @staticmethod
     def unescape_string(escaped):
         return escaped.encode("utf-8").decode("unicode_escape")
@@ -67,8 +82,11 @@ class TreeBuildingVisitor(NodeVisitor):
         else:
             return T.Operator(operator="anyOf", values=operands)
 
-    def visit_not_type(self, node, c) -> T.Not:
-        return T.Not(value=c[1])
+    def visit_not_type(self, node, c) -> T.Type:
+        value = c[1]
+        if isinstance(value, T.Not):  # Double negation
+            return value.value
+        return T.Not(value=value)
 
     def visit_string(self, node, c) -> T.String:
         return T.String(cardinal=c[1], format=None, regex=None)
@@ -82,7 +100,7 @@ class TreeBuildingVisitor(NodeVisitor):
         return T.Number(cardinal=cardinal, multiple=multiple)
 
     def visit_litteral(self, node, c) -> T.Litteral:
-        return T.Litteral(value=node.children[0].text.lower())
+        return T.Litteral(value=node.text.lower())
 
     def visit_kw_forbidden(self, node, c) -> T.Forbidden:
         return T.Forbidden()
@@ -141,22 +159,20 @@ class TreeBuildingVisitor(NodeVisitor):
 
     def visit_object_keyword(self, node, c) -> T.Object:
         return T.Object(
-            properties=[],
+            properties=(),
             additional_property_types=None,
             additional_property_names=None,
             cardinal=c[-1],
         )
 
-    def visit_object_empty(self, node, c) -> T.Object:
-        kwargs = {"properties": []}
-        _, additional_props, _, kwargs["cardinal"] = c
-        kwargs.update(additional_props)
-        return T.Object(**kwargs)
-
-    def visit_object_non_empty(self, node, c) -> T.Object:
+    def visit_object_braces(self, node, c) -> T.Object:
         kwargs = {}
-        _, additional_props, first_field, other_fields, _, kwargs["cardinal"] = c
-        kwargs["properties"] = self.gather_separated_list(first_field, other_fields)
+        _, additional_props, (body,), kwargs["cardinal"] = c
+        if len(body) == 0:  # Empty object, body is the closing brace
+            kwargs["properties"] = ()
+        else:
+            first_field, other_fields, _ = body
+            kwargs["properties"] = self.gather_separated_list(first_field, other_fields)
         kwargs.update(additional_props)
         return T.Object(**kwargs)
 
@@ -169,7 +185,7 @@ class TreeBuildingVisitor(NodeVisitor):
         return T.ObjectProperty(self.unescape_string(key), is_optional, val, description)
 
     def visit_object_pair_unquoted_name(self, node, c) -> str:
-        return node.text
+        return sys.intern(node.text)
 
     def visit_object_only(
         self, node, c
@@ -200,10 +216,10 @@ class TreeBuildingVisitor(NodeVisitor):
             "additional_property_types": maybe_type,
         }
 
-    def visit_array_empty(self, node, c) -> T.Array:
-        return T.Array(items=[], additional_items=True, cardinal=c[-1], unique=False)
+    def visit_array_keyword(self, node, c) -> T.Array:
+        return T.Array(items=(), additional_items=True, cardinal=c[-1], unique=False)
 
-    def visit_array_non_empty(self, node, c) -> T.Array:
+    def visit_array_brackets(self, node, c) -> T.Array:
         """
         With only one type and a "+" / "*" suffix, it's an homogeneous list.
         In this case, if there is a "only" qualifier it is ignored.
@@ -211,7 +227,10 @@ class TreeBuildingVisitor(NodeVisitor):
         with extra items type. Here too, any "only" qualifier will be ignored.
         Without a suffix, it's a tuple type, the "only" qualifier is enforced.
         """
-        _, array_prefix, first_item, other_items, extra, _, card = c
+        _, (body,), card = c
+        if len(body) == 0:  # Empty brackets, body is the closing bracket
+            return T.Array(items=(), additional_items=True, cardinal=card, unique=False)
+        array_prefix, first_item, other_items, extra, _ = body
 
         items = self.gather_separated_list(first_item, other_items)
 
@@ -225,10 +244,6 @@ class TreeBuildingVisitor(NodeVisitor):
             items = items[:-1]
         if card[0] is not None and len(items) >= card[0]:
             card = (None, card[1])  # Constraint is redundant
-        if card[1] is not None and not additional_items and len(items) < card[1]:
-            raise ValueError(
-                f"An array cannot be both {len(items)} and <={card[1]} items long"
-            )
 
         return T.Array(
             items=items,
@@ -285,10 +300,14 @@ class TreeBuildingVisitor(NodeVisitor):
         return (id, type)
 
     def visit_def_identifier(self, node, c) -> str:
-        return node.text
+        return sys.intern(node.text)
 
     def visit_def_reference(self, node, c) -> T.Reference:
-        return T.Reference(value=c[1])
+        name = c[1]
+        reference = self.references.get(name)
+        if reference is None:
+            reference = self.references[name] = T.Reference(value=name)
+        return reference
 
     def generic_visit(self, node, c) -> tuple:
         """ The generic visit method. """
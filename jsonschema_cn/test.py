@@ -6,6 +6,11 @@ from . import tree as T
 from parsimonious.exceptions import IncompleteParseError
 import re
 
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
 
 class TestJSCN(unittest.TestCase):
     def cmp(self, src, sch: dict) -> None:
@@ -107,6 +112,25 @@ class TestJSCN(unittest.TestCase):
             {"type": "object", "properties": {"foo": {"type": "number", "description": "some description"}}}
         )
 
+    def test_shared_reference(self):
+        s = Schema('{a: <x> "some description", b: <x>} where x = integer')
+        a, b = s.value.properties
+        self.assertIs(a.type, b.type)
+        self.assertDictEqual(
+            s.jsonschema["properties"],
+            {"a": {"$ref": "#/definitions/x", "description": "some description"}, "b": {"$ref": "#/definitions/x"}},
+        )
+
+    def test_reference_not_shared_across_parses(self):
+        s1 = Schema("[<y>] where y = integer")
+        s1.jsonschema["items"][0]["title"] = "leak"
+        s2 = Schema("{k: <y>} where y = number")
+        self.assertDictEqual(s2.jsonschema["properties"], {"k": {"$ref": "#/definitions/y"}})
+
+    def test_equivalent_syntaxes(self):
+        self.assertEqual(Schema("object").value, Schema("{}").value)
+        self.assertEqual(Schema("array").value, Schema("[]").value)
+
     def test_array_empty(self):
         array = {"type": "array"}
         self.cmp("[]", array)
@@ -179,6 +203,7 @@ class TestJSCN(unittest.TestCase):
         and unused_1 = [<unused_2>+]
         and used_2 = integer
         and unused_2 = string
+        and unused_3 = {next?: <unused_3>}
         """
         )
         self.assertSetEqual(set(s.jsonschema["definitions"].keys()), {"used_1", "used_2"})
@@ -227,6 +252,60 @@ class TestJSCN(unittest.TestCase):
             },
         )
 
+    def test_combine_flatten(self):
+        s = Schema("integer") | Schema("string") | Schema("null")
+        self.cmp(s, {"anyOf": [{"type": "integer"}, {"type": "string"}, {"type": "null"}]})
+        i = Schema("integer")
+        self.cmp(i | i, {"anyOf": [{"type": "integer"}]})
+        self.cmp(i & (i & Schema("string")), {"allOf": [{"type": "integer"}, {"type": "string"}]})
+
+    def test_flatten_nested_operators(self):
+        self.cmp(
+            "integer | (number | string)",
+            {"anyOf": [{"type": "integer"}, {"type": "number"}, {"type": "string"}]},
+        )
+        self.cmp(
+            "(integer | number) & string",
+            {"allOf": [{"anyOf": [{"type": "integer"}, {"type": "number"}]}, {"type": "string"}]},
+        )
+
+    def test_not(self):
+        self.cmp("not integer", {"not": {"type": "integer"}})
+        self.cmp("not not integer", {"type": "integer"})
+        self.cmp("not not not integer", {"not": {"type": "integer"}})
+
+    def test_cardinal_errors(self):
+        # Detected upon parsing, not compilation
+        with self.assertRaisesRegex(ValueError, "at least 1 properties"):
+            Schema("{a: integer}{_, 0}")
+        with self.assertRaisesRegex(ValueError, "up to 1 properties"):
+            Schema("{only a: integer}{2, _}")
+        with self.assertRaisesRegex(ValueError, "at least 2 items"):
+            Schema("[integer, string]{_, 1}")
+        with self.assertRaisesRegex(ValueError, "up to 2 items"):
+            Schema("[only integer, string]{3, _}")
+        # A redundant maximum isn't an error
+        self.cmp("[only integer]{_, 2}", {"type": "array", "items": [{"type": "integer"}], "additionalItems": False})
+
+    def test_syntax_error_location(self):
+        cases = {
+            "[1, 2]": "line 1 column 2 (rule type)",
+            "[": "line 1 column 2 (rule type)",
+            "[integer 2]": "line 1 column 10 (rule rbracket)",
+            "{only <x: integer}": "line 1 column 7 (rule object_pair)",
+            "{": "line 1 column 2 (rule object_pair)",
+            "{a: integer b: string}": "line 1 column 13 (rule rbrace)",
+            # Unterminated strings and constants: where the closing quote was expected
+            '"abc\\': "line 1 column 6 (rule quote_char)",
+            '{"a\\": integer}': "line 1 column 16 (rule quote_char)",
+            '{a: integer,\n b: "foo}': "line 2 column 10 (rule quote_char)",
+            '{a: `{"x": 1}}': "line 1 column 15 (rule backquote_char)",
+            '{a: `1`, b: `"x}': "line 1 column 17 (rule quote_char)",
+        }
+        for src, location in cases.items():
+            with self.subTest(src=src), self.assertRaisesRegex(ValueError, re.escape(location)):
+                Schema(src)
+
     def test_missing_def(self):
         with self.assertRaisesRegex(ValueError, "Missing definition"):
             Schema("{foo: <bar>}").to_jsonschema()
@@ -239,6 +318,53 @@ class TestJSCN(unittest.TestCase):
             s.validate({"x": "1"})
         with self.assertRaises(jsonschema.ValidationError):
             s.validate({"x": 1, "y": 2})
+        self.assertIs(s.validator, s.validator)
+
+    @unittest.skipUnless(fastjsonschema, "fastjsonschema isn't installed")
+    def test_fast_validate(self):
+        cases = [
+            ('f"date"', ["2020-02-28", "2020-02-30", 1]),
+            ('{a: integer, b?: [string+], "format": r"^x"}', [
+                {"a": 1, "format": "x"}, {"a": 1.5, "format": "x"},
+                {"a": True, "format": "x"}, {"a": 1, "b": []}, {"a": 1, "b": ["x"], "format": "x"},
+            ]),
+            ('{only a: <x>, b: `1` | null} where x = integer{_, 3}', [
+                {"b": 1}, {"b": None, "a": 3}, {"b": None, "a": 4}, {"b": 2}, {"a": 1},
+            ]),
+            ("[unique number*]{1, _}", [[], [1, 2], [1, 1], [1, "x"]]),
+        ]
+        for src, data in cases:
+            s = Schema(src)
+            validator = jsonschema.Draft7Validator(
+                s.jsonschema, format_checker=jsonschema.Draft7Validator.FORMAT_CHECKER,
+            )
+            for d in data:
+                with self.subTest(src=src, data=d):
+                    try:
+                        s.validate(d)
+                        valid = True
+                    except jsonschema.ValidationError:
+                        valid = False
+                    self.assertEqual(valid, validator.is_valid(d))
+        self.assertFalse(Schema('f"date"').fast_validator)
+        self.assertTrue(Schema("[integer*]").fast_validator)
+
+    def test_parse_cache(self):
+        src = "<x> where x = integer"
+        s1, s2 = Schema(src), Schema(src)
+        self.assertIsNot(s1, s2)
+        del s1.jsonschema["definitions"]
+        self.assertIn("definitions", s2.jsonschema)
+        self.assertNotIn("definitions", s1.value.jsonschema)
+        src = "{a: integer, b: <x>} where x = string"
+        s1 = Schema(src)
+        s1.jsonschema["properties"]["a"]["minimum"] = 5
+        s1.jsonschema["definitions"]["x"]["maxLength"] = 3
+        s2 = Schema(src)
+        self.assertDictEqual(s2.jsonschema["properties"]["a"], {"type": "integer"})
+        self.assertDictEqual(s2.jsonschema["definitions"]["x"], {"type": "string"})
+        Definitions("x = integer").values["z"] = 1
+        self.assertNotIn("z", Definitions("x = integer").values)
 
     def test_def_conflict(self):
         with self.assertRaisesRegex(ValueError, "conflict"):
@@ -265,6 +391,25 @@ class TestJSCN(unittest.TestCase):
             },
         )
 
+    def test_reduce(self):
+        from .beta import reduce
+        s = reduce(Schema("[<A>, <A>, <B>] where A = <B> & string and B = string{2}"))
+        a1, a2, b = s.value.items
+        self.assertIs(a1, a2)
+        self.cmp(
+            s,
+            {
+                "type": "array",
+                "items": [
+                    {"allOf": [{"type": "string", "minLength": 2, "maxLength": 2}, {"type": "string"}]},
+                    {"allOf": [{"type": "string", "minLength": 2, "maxLength": 2}, {"type": "string"}]},
+                    {"type": "string", "minLength": 2, "maxLength": 2},
+                ],
+            },
+        )
+        with self.assertRaisesRegex(ValueError, "Missing definition"):
+            reduce(Schema("<A>"))
+
     def test_cond_1(self):
         self.cmp(
             r'''
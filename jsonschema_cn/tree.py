@@ -1,7 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import NamedTuple, Optional, Set, Tuple
 import json
-import jsonschema
 import re
 import logging
 
@@ -25,6 +24,9 @@ class Type(ABC):
       on the way down the tree and on the way back up.
     """
 
+    # Subclasses declare their CONSTRUCTOR_KWARGS as slots: nodes are numerous
+    # and don't need a per-instance `__dict__`.
+    __slots__ = ("_jsonschema", "source")
 
     CONSTRUCTOR_KWARGS: Tuple[str, ...] = ()
 
@@ -116,23 +118,34 @@ class Type(ABC):
 class Schema(Type):
 
     CONSTRUCTOR_KWARGS = ("value", "definitions")
+    __slots__ = CONSTRUCTOR_KWARGS + ("_validator", "_fast_validator")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._validator = None  # Will be filled as a cache on demand
+        self._fast_validator = None  # Same, False if unavailable
 
     def to_jsonschema(self, check_definitions=True, prune=True):
         r = self.value.jsonschema
         if isinstance(r, dict):  # Could also be `False`
-            if self.definitions.values:
-                r["definitions"] = self.definitions.jsonschema
-                if prune:
-                    self._prune(r)
-            if check_definitions:
-                self._check_definitions(r)
-            # Recreate the dict to change keys order
-            r2 = {
+            # Build a new dict, with header keys first: sub-trees and their
+            # cached schemas may be shared, e.g. between parses of the same source.
+            r = {
                 "$schema": "http://json-schema.org/draft-07/schema#",
                 "$comment": str(self),
+                **r,
             }
-            r2.update(r)
-            r = r2
+            has_definitions = bool(self.definitions.values)
+            if not prune:
+                if has_definitions:
+                    r["definitions"] = dict(self.definitions.jsonschema)
+                if check_definitions:
+                    self._check_definitions(r)
+            elif has_definitions or check_definitions:
+                # References are checked while following them: a single scan.
+                definitions = self._reachable_definitions(r, check_definitions)
+                if has_definitions:
+                    r["definitions"] = definitions
         return r
 
     def _check_definitions(self, schema):
@@ -142,59 +155,69 @@ class Schema(Type):
             if k not in self.definitions.values.keys():
                 raise ValueError(f"Missing definition for {k}")
 
-    @classmethod
-    def _prune(cls, schema: dict):
-        """Remove unused definitions on a jsonschema (not a CN schema).
-        May iterate more than once, because
-        some references may be used in other definitions."""
-        occurring_references = cls._get_dict_references(schema)
-        eliminated_references = False
-        while True:
-            for k in list(schema["definitions"].keys()):
-                # Freeze the keys into a list, so that `del` won't interfere
-                if k not in occurring_references:
-                    del schema["definitions"][k]
-                    eliminated_references = True
-            if eliminated_references:
-                # Some unused references have been removed.
-                # By removing their definitions, maybe some other
-                # references became unused => try to prune again.
-                occurring_references = cls._get_dict_references(schema)
-                eliminated_references = False
-            else:
-                # Reached a fix-point, nothing left to eliminate
-                return
+    def _reachable_definitions(self, schema: dict, check_definitions=True) -> dict:
+        """Compile the definitions used by a jsonschema (not a CN schema),
+        directly or through other definitions. Unused definitions are
+        pruned without being compiled, and used ones are scanned once.
+        Optionally verify that all followed references have their definition."""
+        definitions = self.definitions.values
+        compiled = {}
+        pending = list(self._get_dict_references(schema))
+        while pending:
+            name = pending.pop()
+            if name in compiled:
+                pass
+            elif name in definitions:
+                compiled[name] = definitions[name].jsonschema
+                pending.extend(self._get_dict_references(compiled[name]))
+            elif check_definitions:
+                raise ValueError(f"Missing definition for {name}")
+        # Keep definitions in source order
+        return {k: compiled[k] for k in definitions if k in compiled}
 
     @classmethod
     def _get_dict_references(cls, x) -> Set[str]:
         """Extract every definition usage from a compiled jsonschema,
         so that it can be checked that they are all defined."""
-        if isinstance(x, dict):
-            if "$ref" in x:
-                # Don't return immediately, there may be definitions in a "$ref".
-                r = {x["$ref"].rsplit("/", 1)[-1]}
-            else:
-                r = set()
-            for k, v in x.items():
-                if k != "$ref":
-                    r |= cls._get_dict_references(v)
-            return r
-        elif isinstance(x, list):
-            return set.union(*(cls._get_dict_references(y) for y in x))
-        else:
-            return set()
+        references = set()
+        pending = [x]  # Explicit stack rather than recursion
+        # Compiled schemas are made of plain dicts and lists: exact type
+        # checks are enough, and cheaper than `isinstance()`.
+        pop, push, extend = pending.pop, pending.append, pending.extend
+        while pending:
+            x = pop()
+            t = type(x)
+            if t is dict:
+                for k, v in x.items():
+                    # Don't stop at a "$ref", there may be definitions besides it.
+                    if k == "$ref":
+                        references.add(v.rsplit("/", 1)[-1])
+                    else:
+                        push(v)
+            elif t is list:
+                extend(x)
+        return references
+
+    @staticmethod
+    def _uses_format(x) -> bool:
+        """Whether a compiled jsonschema may use formats. Properties named
+        "format" are counted too: erring on that side is harmless."""
+        pending = [x]
+        while pending:
+            x = pending.pop()
+            t = type(x)
+            if t is dict:
+                if "format" in x:
+                    return True
+                pending.extend(x.values())
+            elif t is list:
+                pending.extend(x)
+        return False
 
     def _combine(self, other, op):
-        args = []
         if isinstance(other, Schema):
             # Two schemas: combine main entries and merge defition dicts
-            for schema in (self, other):
-                content = schema.value
-                if isinstance(content, Operator) and content.operator == op:
-                    args.extend(content.values)  # Flatten associative operations
-                else:
-                    args.append(content)
-            combined_content = Operator(operator=op, values=args)
+            combined_content = Operator.of(op, (self.value, other.value))
             combined_defs = self.definitions | other.definitions
             return Schema(value=combined_content, definitions=combined_defs)
         elif op == "anyOf" and (
@@ -217,14 +240,64 @@ class Schema(Type):
     def __or__(self, other):
         return self._combine(other, "anyOf")
 
+    @property
+    def validator(self):
+        """
+        Cached validator for the corresponding jsonschema, which is checked
+        once against the metaschema when the validator is created.
+        """
+        if self._validator is None:
+            import jsonschema  # Slow to import, and only needed to validate
+            schema = self.jsonschema
+            jsonschema.Draft7Validator.check_schema(schema)
+            self._validator = jsonschema.Draft7Validator(
+                schema, format_checker=jsonschema.Draft7Validator.FORMAT_CHECKER,
+            )
+        return self._validator
+
+    @property
+    def fast_validator(self):
+        """
+        Cached validator function generated by `fastjsonschema`, or False
+        if this optional library isn't installed or doesn't support
+        the schema. Schemas with formats aren't supported: `fastjsonschema`
+        doesn't check them like `jsonschema`, and may accept invalid data.
+        """
+        if self._fast_validator is None:
+            self._fast_validator = False
+            try:
+                import fastjsonschema
+            except ImportError:
+                return False
+            schema = self.validator.schema  # Checked against the metaschema
+            if self._uses_format(schema):
+                return False
+            try:
+                self._fast_validator = fastjsonschema.compile(schema)
+            except fastjsonschema.JsonSchemaException:
+                pass
+        return self._fast_validator
+
     def validate(self, data=None):
+        import jsonschema  # Slow to import, and only needed to validate
         if data is None:  # Validate the schema itself
             jsonschema.Draft7Validator.check_schema(self.jsonschema)
         else:  # Validate a piece of data against the schema
-            jsonschema.validate(
-                #data, self.jsonschema, format_checker=jsonschema.draft7_format_checker,
-                data, self.jsonschema, format_checker=jsonschema.Draft7Validator.FORMAT_CHECKER,
-            )
+            fast_validator = self.fast_validator
+            if fast_validator:
+                # Only trusted to accept data: errors are reported by
+                # `jsonschema`, with the same details as without it.
+                from fastjsonschema import JsonSchemaException
+                try:
+                    fast_validator(data)
+                    return
+                except JsonSchemaException:
+                    pass
+            # Same as `jsonschema.validate()`, without re-checking the schema
+            # and re-creating a validator on each call.
+            error = jsonschema.exceptions.best_match(self.validator.iter_errors(data))
+            if error is not None:
+                raise error
 
     def __str__(self):
         if self.definitions.values:
@@ -250,7 +323,7 @@ class Schema(Type):
 
 class Definitions(Type):
 
-    CONSTRUCTOR_KWARGS = ("values",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("values",)
 
     def to_jsonschema(self):
         return {k: v.jsonschema for k, v in self.values.items()}
@@ -259,32 +332,38 @@ class Definitions(Type):
         if isinstance(other, Definitions) or isinstance(other, dict):
             if isinstance(other, dict):
                 other = Definitions.from_dict(other)
-            overlap = set(self.values.keys()) & set(other.values.keys())
-            conflicts = sorted(
-                name for name in overlap if self.values[name] != other.values[name]
-            )
-            if conflicts:
-                raise ValueError(
-                    f"Cannot merge definitions, conflict over {', '.join(conflicts)}"
-                )
-            defs = dict(self.values)
-            defs.update(other.values)
-            return Definitions(values=defs)
+            return Definitions._merge(self.values, other.values)
         elif isinstance(other, Schema):
             return other | self
         else:
             raise ValueError("Cannot perform 'or' on Definitions and that")
 
+    @staticmethod
+    def _merge(*values_dicts):
+        """Merge dicts of definitions and detect conflicts in a single pass."""
+        defs = {}
+        conflicts = set()
+        for values in values_dicts:
+            for name, value in values.items():
+                previous = defs.setdefault(name, value)
+                if previous is not value and previous != value:
+                    conflicts.add(name)
+        if conflicts:
+            raise ValueError(
+                f"Cannot merge definitions, conflict over {', '.join(sorted(conflicts))}"
+            )
+        return Definitions(values=defs)
+
     @staticmethod
     def from_dict(d):
-        definitions = Definitions(values={})
+        values_dicts = []
         for name, schema in d.items():
             if isinstance(schema, str):  # Convert src strings -> Schema
                 from .parse import parse
                 schema = parse("schema", schema)
-            definitions |= schema.definitions
-            definitions |= Definitions(values={name: schema.value})
-        return definitions
+            values_dicts.append(schema.definitions.values)
+            values_dicts.append({name: schema.value})
+        return Definitions._merge(*values_dicts)  # Merged once, not per entry
 
     def __str__(self):
         if self.values:
@@ -306,7 +385,7 @@ class Definitions(Type):
 
 class Number(Type):
 
-    CONSTRUCTOR_KWARGS = ("cardinal", "multiple")
+    __slots__ = CONSTRUCTOR_KWARGS = ("cardinal", "multiple")
 
     TYPE_NAME = "number"
 
@@ -336,12 +415,13 @@ class Number(Type):
 
 
 class Integer(Number):
+    __slots__ = ()
     TYPE_NAME = "integer"
 
 
 class String(Type):
 
-    CONSTRUCTOR_KWARGS = ("cardinal", "format", "regex")
+    __slots__ = CONSTRUCTOR_KWARGS = ("cardinal", "format", "regex")
 
     def to_jsonschema(self):
         r = {"type": "string"}
@@ -377,7 +457,7 @@ class String(Type):
 
 
 class Forbidden(Type):
-    CONSTRUCTOR_KWARGS = ()
+    __slots__ = CONSTRUCTOR_KWARGS = ()
 
     def to_jsonschema(self):
         return False
@@ -387,7 +467,7 @@ class Forbidden(Type):
 
 
 class Litteral(Type):
-    CONSTRUCTOR_KWARGS = ("value",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("value",)
 
     def to_jsonschema(self):
         return {"type": self.value}
@@ -397,7 +477,7 @@ class Litteral(Type):
 
 
 class Constant(Type):
-    CONSTRUCTOR_KWARGS = ("value",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("value",)
 
     def to_jsonschema(self):
         return {"const": self.value}
@@ -411,10 +491,47 @@ class Constant(Type):
 
 
 class Operator(Type):
-    CONSTRUCTOR_KWARGS = ("operator", "values")
+    __slots__ = CONSTRUCTOR_KWARGS = ("operator", "values")
+
+    # Operators which can be flattened; "oneOf" can't: one of (one of a, b)
+    # and c doesn't mean one of a, b and c.
+    ASSOCIATIVE_OPERATORS = frozenset({"anyOf", "allOf"})
+
+    @classmethod
+    def of(cls, operator, values):
+        """Combine values with an operator, in a single pass which flattens
+        values already combined with the same associative operator.
+        Since those operators are also idempotent, repeated values are
+        dropped; they are recognized by identity, which is cheap."""
+        if operator not in cls.ASSOCIATIVE_OPERATORS:
+            return cls(operator=operator, values=list(values))
+        flat_values = []
+        seen = set()
+        for v in values:
+            if isinstance(v, Operator) and v.operator == operator:
+                operands = v.values
+            else:
+                operands = (v,)
+            for operand in operands:
+                if id(operand) not in seen:
+                    seen.add(id(operand))
+                    flat_values.append(operand)
+        return cls(operator=operator, values=flat_values)
 
     def to_jsonschema(self):
-        return {self.operator: [v.jsonschema for v in self.values]}
+        op = self.operator
+        if op not in self.ASSOCIATIVE_OPERATORS:
+            return {op: [v.jsonschema for v in self.values]}
+        # Flatten nested operations, e.g. from parentheses or references
+        # being reduced: "a | (b | c)" becomes anyOf(a, b, c).
+        values = []
+        for v in self.values:
+            json_v = v.jsonschema
+            if type(json_v) is dict and len(json_v) == 1 and op in json_v:
+                values.extend(json_v[op])
+            else:
+                values.append(json_v)
+        return {op: values}
 
     def __str__(self):
         # TODO Different operator for oneOf/anyOf
@@ -434,7 +551,7 @@ class Operator(Type):
 
 
 class Not(Type):
-    CONSTRUCTOR_KWARGS = ("value",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("value",)
 
     def to_jsonschema(self):
         return {"not": self.value.jsonschema}
@@ -455,7 +572,7 @@ class Not(Type):
 
 
 class Enum(Type):
-    CONSTRUCTOR_KWARGS = ("values",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("values",)
 
     def to_jsonschema(self):
         return {"enum": list(self.values)}
@@ -467,7 +584,7 @@ class Enum(Type):
 
 
 class Reference(Type):
-    CONSTRUCTOR_KWARGS = ("value",)
+    __slots__ = CONSTRUCTOR_KWARGS = ("value",)
 
     def to_jsonschema(self):
         return {"$ref": "#/definitions/" + self.value}
@@ -491,6 +608,28 @@ class Object(Type):
         "additional_property_types",
         "additional_property_names",
     )
+    __slots__ = CONSTRUCTOR_KWARGS + ("_implicit_cardinal",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Cardinal bounds implied by the properties don't depend on compilation:
+        # compute them and check them against explicit ones once, here.
+        card_min, card_max = self.cardinal
+        implicit_card_min = sum(1 for (_, opt, *_) in self.properties if not opt)
+        apt = self.additional_property_types
+        if apt is False or isinstance(apt, Forbidden):  # Closed object
+            implicit_card_max = len({k for (k, *_) in self.properties})
+        else:
+            implicit_card_max = None
+        if card_min is not None and implicit_card_max is not None and card_min > implicit_card_max:
+            raise ValueError(
+                f"Can only have up to {implicit_card_max} properties, not {card_min}"
+            )
+        if card_max is not None and implicit_card_min > card_max:
+            raise ValueError(
+                f"Must have at least {implicit_card_min} properties, which is more than {card_max}"
+            )
+        self._implicit_cardinal = (implicit_card_min, implicit_card_max)
 
     def to_jsonschema(self):
         card_min, card_max = self.cardinal
@@ -507,38 +646,28 @@ class Object(Type):
             else:
                 json_v = v.jsonschema
                 if description is not None:
-                    json_v["description"] = description
+                    # Don't alter `v`'s cached schema, `v` may be shared.
+                    json_v = dict(json_v, description=description)
             properties[k] = json_v
         if required:
             r["required"] = required
         if properties:
             r["properties"] = properties
 
-        if self.additional_property_types is False:
+        apt = self.additional_property_types
+        apn = self.additional_property_names
+        if apt is False:
             r["additionalProperties"] = False
-        elif self.additional_property_types is not None:
-            r["additionalProperties"] = self.additional_property_types.jsonschema
-        if self.additional_property_names is not None:
-            r["propertyNames"] = self.additional_property_names.jsonschema
-
-        implicit_card_min = len(required)
-        implicit_card_max = (
-            len(properties) if r.get("additionalProperties") is False else None
-        )
-        if card_min is not None:
-            if card_min > implicit_card_min:
-                r["minProperties"] = card_min
-            if implicit_card_max is not None and card_min > implicit_card_max:
-                raise ValueError(
-                    f"Can only have up to {implicit_card_max} properties, not {card_min}"
-                )
-        if card_max is not None:
-            if implicit_card_max is None or card_max < implicit_card_max:
-                r["maxProperties"] = card_max
-            if implicit_card_min > card_max:
-                raise ValueError(
-                    f"Must have at least {implicit_card_min} properties, which is more than {card_max}"
-                )
+        elif apt is not None:
+            r["additionalProperties"] = apt.jsonschema
+        if apn is not None:
+            r["propertyNames"] = apn.jsonschema
+
+        implicit_card_min, implicit_card_max = self._implicit_cardinal
+        if card_min is not None and card_min > implicit_card_min:
+            r["minProperties"] = card_min
+        if card_max is not None and (implicit_card_max is None or card_max < implicit_card_max):
+            r["maxProperties"] = card_max
         return r
 
     def __str__(self):
@@ -597,9 +726,9 @@ class Object(Type):
         s = self.visit_down(visitor)
         if s is not self:
             return s
-        visited_props = [
+        visited_props = tuple(
             ObjectProperty(p[0], p[1], p[2].visit(visitor)) for p in self.properties
-        ]
+        )
 
         apn = self.additional_property_names
         if isinstance(apn, Type):
@@ -626,42 +755,52 @@ class Object(Type):
 class Array(Type):
 
     CONSTRUCTOR_KWARGS = ("items", "additional_items", "cardinal", "unique")
+    __slots__ = CONSTRUCTOR_KWARGS + ("_implicit_cardinal",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Cardinal bounds implied by the items don't depend on compilation:
+        # compute them and check them against explicit ones once, here.
+        card_min, card_max = self.cardinal
+        implicit_card_min = len(self.items)
+        implicit_card_max = implicit_card_min if self.additional_items is False else None
+        if card_min is not None and implicit_card_max is not None and card_min > implicit_card_max:
+            raise ValueError(
+                f"Can only have up to {implicit_card_max} items, not {card_min}"
+            )
+        if card_max is not None and implicit_card_min > card_max:
+            raise ValueError(
+                f"Must have at least {implicit_card_min} items, which is more than {card_max}"
+            )
+        self._implicit_cardinal = (implicit_card_min, implicit_card_max)
 
     def to_jsonschema(self):
         # types = self.kwargs["types"]
         # extra_type = self.kwargs["additional_types"]
         # card_min, card_max = self.kwargs["cardinal"]
         r = {"type": "array"}
+        items = self.items
+        additional_items = self.additional_items
 
-        if self.items:  # Tuple array
-            r["items"] = [item.jsonschema for item in self.items]
-            if self.additional_items is False:  # No extra items allowed
+        if items:  # Tuple array
+            r["items"] = [item.jsonschema for item in items]
+            if additional_items is False:  # No extra items allowed
                 r["additionalItems"] = False
-            elif self.additional_items is True:  # Extra items with any type
+            elif additional_items is True:  # Extra items with any type
                 pass
             else:  # extra items allowed, but wiht a constrained type
-                r["additionalItems"] = self.additional_items.jsonschema
+                r["additionalItems"] = additional_items.jsonschema
         elif isinstance(
-            self.additional_items, Type
+            additional_items, Type
         ):  # List array with homogeneous type
-            r["items"] = self.additional_items.jsonschema
+            r["items"] = additional_items.jsonschema
 
         card_min, card_max = self.cardinal
-        implicit_card_min = len(self.items)
-        implicit_card_max = len(self.items) if self.additional_items is False else None
+        implicit_card_min, implicit_card_max = self._implicit_cardinal
         if card_min is not None and card_min > implicit_card_min:
             r["minItems"] = card_min
-            if implicit_card_max is not None and card_min > implicit_card_max:
-                raise ValueError(
-                    f"Can only have up to {implicit_card_max} items, not {card_min}"
-                )
-        if card_max is not None:
-            if implicit_card_min > card_max:
-                raise ValueError(
-                    f"Must have at least {implicit_card_min} items, which is more than {card_max}"
-                )
-            if implicit_card_max is None or card_max < implicit_card_max:
-                r["maxItems"] = card_max
+        if card_max is not None and (implicit_card_max is None or card_max < implicit_card_max):
+            r["maxItems"] = card_max
 
         if self.unique:
             r["uniqueItems"] = True
@@ -704,7 +843,7 @@ class Array(Type):
         s = self.visit_down(visitor)
         if s is not self:
             return s
-        visited_items = [c.visit(visitor) for c in self.items]
+        visited_items = tuple(c.visit(visitor) for c in self.items)
         if isinstance(self.additional_items, Type):
             additems = self.additional_items.visit(visitor)
         else:
@@ -725,7 +864,7 @@ class Array(Type):
 
 class Conditional(Type):
 
-    CONSTRUCTOR_KWARGS = ("if_term", "then_term", "else_term")
+    __slots__ = CONSTRUCTOR_KWARGS = ("if_term", "then_term", "else_term")
 
     def to_jsonschema(self):
         r = {"if": self.if_term.jsonschema, "then": self.then_term.jsonschema}
@@ -1,7 +1,7 @@
-from parsimonious import NodeVisitor
+from .dispatch import DispatchingNodeVisitor
 
 
-class UnspaceVisitor(NodeVisitor):
+class UnspaceVisitor(DispatchingNodeVisitor):
     """Remove space tokens from a Parsimonious parse tree."""
 
     # TODO generate a set of space offsets in the code, so that they can
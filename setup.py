@@ -1,3 +1,4 @@
+import os
 import re
 from setuptools import setup
 
@@ -10,6 +11,25 @@ with open("jsonschema_cn/__init__.py") as fh:
     version = re.search(r'^__version__\s*=\s*["\'](.*)["\']', fh.read(), re.M).group(1)
 
 
+# Optional native build: set JSCN_CYTHON=1 to compile the package's modules
+# with Cython. Without Cython, the pure Python modules are used. The .py
+# sources are shipped either way.
+ext_modules = []
+if os.environ.get("JSCN_CYTHON"):
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        pass
+    else:
+        ext_modules = cythonize(
+            [f'jsonschema_cn/{name}.py' for name in (
+                'beta', 'cli', 'dispatch', 'grammar', 'indent', 'parse', 'peg_visitor', 'tree', 'unspace',
+            )],
+            # Annotations are documentation here, not C types to enforce.
+            compiler_directives={'language_level': '3', 'annotation_typing': False},
+        )
+
+
 setup(name='jsonschema_cn',
       version=version,
       description='Compact notation for JSON Schemas',
@@ -27,10 +47,15 @@ setup(name='jsonschema_cn',
       keywords='DSL JSON schema jsonschema',
       license='BSD',
       packages=['jsonschema_cn'],
+      ext_modules=ext_modules,
       install_requires=[
           'parsimonious>=0.8.0',
           'jsonschema>=3.0.1'
       ],
+      extras_require={
+          # Faster `Schema.validate()` on valid data
+          'fast': ['fastjsonschema'],
+      },
       entry_points={
           "console_scripts": ['jscn = jsonschema_cn.cli:main']
       },